@@ -4,9 +4,10 @@ from pathlib import Path
 from dotenv import load_dotenv
 from google.adk.agents.llm_agent import Agent
 from google.adk.agents.base_agent import AgentState
-from google.adk.tools import FunctionTool
+from google.adk.tools import FunctionTool, ToolContext
 import google.genai.types as types
-from .visualizacion import generar_rio_emocional, guardar_imagen_texto
+from .visualizacion import generar_rio_emocional, generar_imagen_texto, guardar_imagen
+from .montaje import obtener_montaje
 
 # Cargar variables de entorno desde .env en el directorio raíz
 env_path = Path(__file__).parent.parent / '.env'
@@ -111,7 +112,7 @@ async def guardar_interpretacion_emocional(interpretacion: str) -> str:
 
 
 # Tool para crear imagen desde la interpretación guardada
-async def crear_imagen_rio_emocional() -> str:
+async def crear_imagen_rio_emocional(tool_context: ToolContext) -> str:
     """
     Crea una visualización artística basada en la última interpretación del río emocional.
 
@@ -120,6 +121,21 @@ async def crear_imagen_rio_emocional() -> str:
 
     Llama a esta función cuando el usuario solicite crear una imagen.
 
+    Returns:
+        Mensaje de confirmación con la ruta de la imagen guardada
+    """
+    # ADK inyecta tool_context; la sesión decide en qué montaje entra el trazo
+    return await crear_imagen_rio_emocional_sesion(tool_context.session.id)
+
+
+async def crear_imagen_rio_emocional_sesion(session_id: str) -> str:
+    """
+    Crea la visualización de la última interpretación y la añade al montaje
+    de la sesión indicada
+
+    Args:
+        session_id: Sesión a la que pertenece la imagen
+
     Returns:
         Mensaje de confirmación con la ruta de la imagen guardada
     """
@@ -130,7 +146,11 @@ async def crear_imagen_rio_emocional() -> str:
 
     try:
         # Generar y guardar la imagen usando la interpretación
-        ruta_imagen = guardar_imagen_texto(_ultima_interpretacion)
+        imagen = generar_imagen_texto(_ultima_interpretacion)
+        ruta_imagen = guardar_imagen(imagen)
+
+        # Añadir solo este trazo al montaje de la sesión
+        obtener_montaje(session_id).agregar(imagen)
 
         # Limpiar la interpretación después de usarla
         _ultima_interpretacion = ""
@@ -0,0 +1,268 @@
+"""
+Almacén en disco para las imágenes generadas, con subcarpetas por hash,
+escrituras atómicas y asíncronas, y una política de retención aplicada
+por un barrido en segundo plano
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path as FilePath
+from PIL import Image
+
+
+# Valores por defecto de la política de retención
+MAX_EDAD_SEGUNDOS = 7 * 24 * 3600  # Una semana
+MAX_BYTES_TOTALES = 500 * 1024 * 1024  # 500 MB
+INTERVALO_BARRIDO_SEGUNDOS = 300  # Cada 5 minutos
+
+# Temporales más viejos que esto se consideran restos de una escritura interrumpida
+GRACIA_TEMPORALES_SEGUNDOS = 3600
+
+
+def _modo_por_umask() -> int:
+    """Permisos que tendría un archivo creado normalmente con la umask actual"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# Se calcula al importar, antes de que haya hilos: os.umask cambia la del proceso entero
+_MODO_ARCHIVOS = _modo_por_umask()
+
+
+class AlmacenImagenes:
+    """
+    Guarda imágenes PNG repartidas en subcarpetas según el hash del nombre
+    (p. ej. ``ab/cd/trazo_....png``) para que ningún directorio crezca sin límite.
+
+    Las escrituras se hacen en un hilo aparte sobre un archivo temporal que luego
+    se renombra, así nunca queda un PNG a medio escribir con su nombre final.
+    Un hilo de barrido borra periódicamente las imágenes más viejas que
+    ``max_edad_segundos`` y, si el total sigue superando ``max_bytes_totales``,
+    las más antiguas hasta volver a estar por debajo del límite. Solo gestiona
+    lo que está dentro de las subcarpetas ``xx/yy``; los archivos sueltos en la
+    raíz (p. ej. las imágenes de ejemplo del repositorio) no se tocan.
+    """
+
+    def __init__(self, raiz: FilePath,
+                 max_edad_segundos: float = MAX_EDAD_SEGUNDOS,
+                 max_bytes_totales: int = MAX_BYTES_TOTALES,
+                 intervalo_barrido: float = INTERVALO_BARRIDO_SEGUNDOS,
+                 hilos_escritura: int = 2):
+        """
+        Args:
+            raiz: Carpeta base del almacén
+            max_edad_segundos: Antigüedad máxima de una imagen antes de borrarla
+            max_bytes_totales: Tamaño total máximo del almacén en bytes
+            intervalo_barrido: Segundos entre dos barridos de retención
+            hilos_escritura: Número de hilos dedicados a codificar y escribir PNGs
+        """
+        self.raiz = FilePath(raiz)
+        self.raiz.mkdir(parents=True, exist_ok=True)
+        self.max_edad_segundos = max_edad_segundos
+        self.max_bytes_totales = max_bytes_totales
+        self.intervalo_barrido = intervalo_barrido
+
+        self._escritor = ThreadPoolExecutor(max_workers=hilos_escritura,
+                                            thread_name_prefix='almacen-imagenes')
+        self._modo_archivos = _MODO_ARCHIVOS
+        self._carpetas_creadas = set()
+        self._lock_carpetas = threading.Lock()
+        self._detener_barrido = threading.Event()
+        self._hilo_barrido = None
+
+    def ruta_para(self, nombre_archivo: str) -> FilePath:
+        """
+        Calcula la ruta final de un archivo dentro del almacén
+
+        Args:
+            nombre_archivo: Nombre del archivo (sin carpetas)
+
+        Returns:
+            Path: Ruta ``raiz/xx/yy/nombre_archivo`` según el hash del nombre
+        """
+        digest = hashlib.sha1(nombre_archivo.encode('utf-8')).hexdigest()
+        return self.raiz / digest[:2] / digest[2:4] / nombre_archivo
+
+    def buscar(self, patron: str) -> list[FilePath]:
+        """
+        Busca imágenes del almacén por nombre
+
+        Args:
+            patron: Patrón glob sobre el nombre del archivo (p. ej. ``montaje_ab12_*.png``)
+
+        Returns:
+            list: Rutas de los archivos que coinciden
+        """
+        return list(self.raiz.glob(f'*/*/{patron}'))
+
+    def _crear_temporal(self, carpeta: FilePath) -> tuple[int, str]:
+        # Evitar un mkdir por escritura: cada subcarpeta se crea una sola vez.
+        # El lock impide que el barrido borre la carpeta antes de que exista el temporal
+        with self._lock_carpetas:
+            if carpeta not in self._carpetas_creadas:
+                carpeta.mkdir(parents=True, exist_ok=True)
+                self._carpetas_creadas.add(carpeta)
+            return tempfile.mkstemp(dir=carpeta, prefix='.', suffix='.tmp')
+
+    @contextmanager
+    def abrir_escritura(self, nombre_archivo: str):
+        """
+        Abre un archivo temporal para escribir y lo renombra a su ruta final
+        solo si la escritura termina sin errores
+
+        Args:
+            nombre_archivo: Nombre del archivo (sin carpetas)
+
+        Yields:
+            Archivo binario abierto para escritura
+        """
+        ruta = self.ruta_para(nombre_archivo)
+        descriptor, ruta_temporal = self._crear_temporal(ruta.parent)
+        try:
+            # mkstemp crea el archivo con 0600; dejar los permisos habituales
+            os.fchmod(descriptor, self._modo_archivos)
+            with os.fdopen(descriptor, 'wb') as archivo:
+                yield archivo
+            os.replace(ruta_temporal, ruta)
+        except BaseException:
+            try:
+                os.unlink(ruta_temporal)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _escribir_png(self, imagen: Image.Image, nombre_archivo: str) -> FilePath:
+        with self.abrir_escritura(nombre_archivo) as archivo:
+            imagen.save(archivo, 'PNG')
+        return self.ruta_para(nombre_archivo)
+
+    def guardar(self, imagen: Image.Image, nombre_archivo: str) -> Future:
+        """
+        Encola la codificación y escritura de la imagen como PNG
+
+        La imagen no debe modificarse después de llamar a este método.
+
+        Args:
+            imagen: Imagen PIL a guardar
+            nombre_archivo: Nombre del archivo (sin carpetas)
+
+        Returns:
+            Future: Se resuelve con la ruta final cuando el archivo está en disco
+        """
+        escritura = self._escritor.submit(self._escribir_png, imagen, nombre_archivo)
+        escritura.add_done_callback(lambda futuro: self._informar_error(futuro, nombre_archivo))
+        return escritura
+
+    @staticmethod
+    def _informar_error(escritura: Future, nombre_archivo: str) -> None:
+        # Sin esto, un fallo (disco lleno, permisos...) se perdería si nadie espera el Future
+        error = escritura.exception()
+        if error is not None:
+            print(f"Error al guardar la imagen {nombre_archivo}: {error}")
+
+    def barrer(self) -> int:
+        """
+        Aplica la política de retención una vez
+
+        Returns:
+            int: Número de archivos borrados
+        """
+        ahora = time.time()
+        limite_edad = ahora - self.max_edad_segundos
+        limite_temporales = ahora - GRACIA_TEMPORALES_SEGUNDOS
+        archivos = []  # (mtime, tamaño, ruta)
+        bytes_en_escritura = 0  # Temporales recientes: cuentan para el total, no se borran
+
+        borradas = 0
+        carpetas_tocadas = set()
+        for ruta in self.raiz.glob('*/*/*'):
+            try:
+                estado = ruta.stat()
+            except FileNotFoundError:
+                continue
+            if ruta.name.startswith('.') and ruta.suffix == '.tmp':
+                # Restos de una escritura interrumpida (p. ej. un póster a medias)
+                if estado.st_mtime < limite_temporales and self._borrar(ruta):
+                    borradas += 1
+                    carpetas_tocadas.add(ruta.parent)
+                else:
+                    bytes_en_escritura += estado.st_size
+            elif ruta.suffix == '.png':
+                archivos.append((estado.st_mtime, estado.st_size, ruta))
+
+        conservadas = []
+        for mtime, tamano, ruta in archivos:
+            if mtime < limite_edad and self._borrar(ruta):
+                borradas += 1
+                carpetas_tocadas.add(ruta.parent)
+            else:
+                conservadas.append((mtime, tamano, ruta))
+
+        # Si aún se supera el tamaño máximo, borrar primero las más antiguas
+        total = bytes_en_escritura + sum(tamano for _, tamano, _ in conservadas)
+        conservadas.sort()
+        for mtime, tamano, ruta in conservadas:
+            if total <= self.max_bytes_totales:
+                break
+            if self._borrar(ruta):
+                borradas += 1
+                total -= tamano
+                carpetas_tocadas.add(ruta.parent)
+
+        self._podar_carpetas(carpetas_tocadas)
+        return borradas
+
+    def _podar_carpetas(self, carpetas: set) -> None:
+        """Elimina las subcarpetas xx/yy (y xx) que quedaron vacías tras el barrido"""
+        with self._lock_carpetas:
+            for carpeta in carpetas:
+                # De la subcarpeta más profunda hacia arriba, sin tocar la raíz
+                while carpeta != self.raiz and self.raiz in carpeta.parents:
+                    try:
+                        carpeta.rmdir()
+                    except OSError:  # No está vacía (o ya no existe)
+                        break
+                    self._carpetas_creadas.discard(carpeta)
+                    carpeta = carpeta.parent
+
+    @staticmethod
+    def _borrar(ruta: FilePath) -> bool:
+        try:
+            ruta.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _bucle_barrido(self) -> None:
+        while not self._detener_barrido.wait(self.intervalo_barrido):
+            try:
+                self.barrer()
+            except OSError as e:
+                print(f"Error en el barrido del almacén de imágenes: {e}")
+
+    def iniciar_barrido(self) -> None:
+        """
+        Arranca el hilo de barrido en segundo plano (si no estaba ya en marcha)
+        """
+        if self._hilo_barrido is not None and self._hilo_barrido.is_alive():
+            return
+        self._detener_barrido.clear()
+        self._hilo_barrido = threading.Thread(target=self._bucle_barrido,
+                                              name='almacen-imagenes-barrido',
+                                              daemon=True)
+        self._hilo_barrido.start()
+
+    def cerrar(self) -> None:
+        """
+        Detiene el barrido y espera a que terminen las escrituras pendientes
+        """
+        self._detener_barrido.set()
+        if self._hilo_barrido is not None:
+            self._hilo_barrido.join()
+            self._hilo_barrido = None
+        self._escritor.shutdown(wait=True)
@@ -0,0 +1,206 @@
+"""
+Montaje por sesión (hoja de contactos) con todos los trazos generados
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from PIL import Image
+from .visualizacion import obtener_almacen_imagenes
+
+
+# Geometría de las miniaturas y de cada hoja del montaje
+ANCHO_MINIATURA, ALTO_MINIATURA = 200, 140  # 1/5 del canvas de 1000x700
+COLUMNAS, FILAS = 6, 6
+MARGEN = 10
+COLOR_FONDO = '#E8E8E8'
+
+# Sesiones con montaje en memoria; al superarse se descarta la menos usada
+MAX_SESIONES = 64
+
+
+def _prefijo_sesion(session_id: str) -> str:
+    """Prefijo de los archivos de hojas de una sesión (estable entre reinicios)"""
+    digest = hashlib.sha1(session_id.encode('utf-8')).hexdigest()[:16]
+    return f"montaje_{digest}"
+
+
+class MontajeSesion:
+    """
+    Hoja de contactos incremental con los trazos de una sesión.
+
+    Cada trazo nuevo se reduce a miniatura y se pega en la siguiente celda libre
+    de la hoja en curso, sin volver a dibujar las anteriores. Las hojas tienen un
+    tamaño fijo de ``COLUMNAS x FILAS`` celdas; cuando una se llena se escribe
+    en el almacén de imágenes y la siguiente se crea con el próximo trazo, así el
+    coste de cada actualización (y de codificar la hoja en curso) no depende de
+    la longitud del historial y en memoria solo queda la hoja en curso.
+
+    Los archivos de las hojas se nombran a partir de la sesión
+    (``montaje_<hash>_<n>.png``), de modo que un montaje nuevo de la misma sesión
+    (tras salir de la caché o reiniciar el proceso) recupera las hojas que el
+    almacén aún conserva y continúa en la hoja siguiente.
+    """
+
+    def __init__(self, session_id: str, almacen=None):
+        """
+        Args:
+            session_id: Identificador de la sesión
+            almacen: Almacén donde guardar las hojas (por defecto, el del proyecto)
+        """
+        self._almacen = almacen or obtener_almacen_imagenes()
+        self._prefijo = _prefijo_sesion(session_id)
+        self._lock = threading.Lock()
+
+        # Hojas ya guardadas: índice -> Future de la escritura o ruta en disco
+        self._hojas = {}
+        for ruta in self._almacen.buscar(f"{self._prefijo}_*.png"):
+            indice = ruta.stem.rsplit('_', 1)[-1]
+            if indice.isdigit():
+                self._hojas[int(indice)] = ruta
+
+        self._indice_actual = max(self._hojas, default=-1) + 1  # Índice de la hoja en curso
+        self._hoja_actual = None  # Se crea al pegar su primera miniatura
+        self._celdas_ocupadas = 0  # Miniaturas pegadas en la hoja en curso
+        self._png_actual = None  # Caché del PNG de la hoja en curso
+
+    @staticmethod
+    def _nueva_hoja() -> Image.Image:
+        ancho = COLUMNAS * ANCHO_MINIATURA + (COLUMNAS + 1) * MARGEN
+        alto = FILAS * ALTO_MINIATURA + (FILAS + 1) * MARGEN
+        return Image.new('RGB', (ancho, alto), color=COLOR_FONDO)
+
+    @staticmethod
+    def posicion_celda(indice: int, miniatura_size: tuple = (ANCHO_MINIATURA, ALTO_MINIATURA)) -> tuple[int, int]:
+        """
+        Esquina superior izquierda de una miniatura en su celda (centrada)
+
+        Args:
+            indice: Número de celda dentro de la hoja (por filas)
+            miniatura_size: Tamaño (ancho, alto) de la miniatura
+
+        Returns:
+            tuple: Coordenadas (x, y) dentro de la hoja
+        """
+        fila, columna = divmod(indice, COLUMNAS)
+        x = MARGEN + columna * (ANCHO_MINIATURA + MARGEN) + (ANCHO_MINIATURA - miniatura_size[0]) // 2
+        y = MARGEN + fila * (ALTO_MINIATURA + MARGEN) + (ALTO_MINIATURA - miniatura_size[1]) // 2
+        return x, y
+
+    @property
+    def total_hojas(self) -> int:
+        """Número de hojas, contando la que está en curso si ya tiene algún trazo"""
+        return self._indice_actual + (1 if self._hoja_actual is not None else 0)
+
+    def _nombre_hoja(self, indice: int) -> str:
+        return f"{self._prefijo}_{indice:04d}.png"
+
+    def _guardar_hoja_actual(self) -> None:
+        # Debe llamarse con el lock tomado; la hoja en curso pasa al almacén
+        self._hojas[self._indice_actual] = self._almacen.guardar(self._hoja_actual,
+                                                                 self._nombre_hoja(self._indice_actual))
+        self._indice_actual += 1
+        self._hoja_actual = None
+        self._celdas_ocupadas = 0
+        self._png_actual = None
+
+    def agregar(self, imagen: Image.Image) -> None:
+        """
+        Añade un trazo al montaje
+
+        Args:
+            imagen: Imagen PIL del trazo (no se modifica)
+        """
+        miniatura = imagen.convert('RGB')
+        miniatura.thumbnail((ANCHO_MINIATURA, ALTO_MINIATURA), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+        with self._lock:
+            if self._hoja_actual is None:
+                self._hoja_actual = self._nueva_hoja()
+
+            # Solo se pega la miniatura nueva sobre la hoja en caché
+            self._hoja_actual.paste(miniatura, self.posicion_celda(self._celdas_ocupadas, miniatura.size))
+            self._celdas_ocupadas += 1
+            self._png_actual = None
+
+            if self._celdas_ocupadas == COLUMNAS * FILAS:
+                self._guardar_hoja_actual()
+
+    def guardar_hoja_en_curso(self) -> None:
+        """
+        Escribe en el almacén la hoja en curso aunque no esté llena (p. ej. al
+        salir de la caché de sesiones); el siguiente trazo empieza otra hoja
+        """
+        with self._lock:
+            if self._hoja_actual is not None:
+                self._guardar_hoja_actual()
+
+    @staticmethod
+    def _codificar(hoja: Image.Image) -> bytes:
+        buf = io.BytesIO()
+        hoja.save(buf, format='PNG')
+        return buf.getvalue()
+
+    def png(self, hoja: int = -1) -> bytes:
+        """
+        Devuelve una hoja del montaje como PNG
+
+        Puede bloquear mientras termina la escritura de la hoja o se lee del disco.
+
+        Args:
+            hoja: Índice de la hoja (por defecto la última que tiene algún trazo)
+
+        Returns:
+            bytes: Imagen PNG de la hoja
+
+        Raises:
+            IndexError: Si la hoja no existe o la retención del almacén ya la borró
+        """
+        with self._lock:
+            total = self.total_hojas
+            indice = hoja + total if hoja < 0 else hoja
+            if not 0 <= indice < total:
+                raise IndexError(f"La hoja {hoja} no existe (hay {total})")
+            if indice == self._indice_actual:
+                if self._png_actual is None:
+                    self._png_actual = self._codificar(self._hoja_actual)
+                return self._png_actual
+            fuente = self._hojas.get(indice)
+
+        # Fuera del lock: puede esperar a que termine la escritura en disco
+        try:
+            if fuente is None:
+                raise FileNotFoundError
+            ruta = fuente.result() if isinstance(fuente, Future) else fuente
+            return ruta.read_bytes()
+        except FileNotFoundError:
+            raise IndexError(f"La hoja {hoja} ya no está disponible")
+
+
+# Montajes por sesión, del menos al más usado recientemente
+_montajes_sesiones = OrderedDict()
+_lock_montajes = threading.Lock()
+
+
+def obtener_montaje(session_id: str) -> MontajeSesion:
+    """
+    Devuelve el montaje de una sesión, creándolo (con las hojas que ya haya en
+    el almacén) si no está en memoria
+
+    Args:
+        session_id: Identificador de la sesión
+
+    Returns:
+        MontajeSesion: Montaje de la sesión
+    """
+    with _lock_montajes:
+        if session_id in _montajes_sesiones:
+            _montajes_sesiones.move_to_end(session_id)
+        else:
+            _montajes_sesiones[session_id] = MontajeSesion(session_id)
+            if len(_montajes_sesiones) > MAX_SESIONES:
+                # La hoja a medias de la sesión descartada no se pierde
+                _, descartado = _montajes_sesiones.popitem(last=False)
+                descartado.guardar_hoja_en_curso()
+        return _montajes_sesiones[session_id]
@@ -3,11 +3,20 @@ Herramienta para generar visualizaciones del río emocional
 """
 import io
 import os
+import struct
+import threading
+import uuid
+import zlib
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path as FilePath
+from typing import Optional
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 import google.genai.types as types
+from .almacen_imagenes import AlmacenImagenes
 
 
 
@@ -175,6 +184,7 @@ def interpretar_texto_a_parametros(texto: str) -> dict:
         'consonantes': consonantes,
         'espacios': espacios,
         'palabras': palabras,
+        'signos_pregunta': signos_pregunta,
         'intensidad': signos_exclamacion * 1.5 + signos_pregunta * 0.8, # Más peso a exclamación
         'calma': signos_puntos * 0.7, # Más puntos = más calma
         'frecuencia_onda': max(0.5, vocales / 7),  # Más vocales = más ondas base
@@ -184,7 +194,8 @@ def interpretar_texto_a_parametros(texto: str) -> dict:
     }
 
 
-def generar_puntos_numpy(parametros: dict, img_width: int, img_height: int) -> list[tuple[int, int]]:
+def generar_puntos_numpy(parametros: dict, img_width: int, img_height: int,
+                         rng: Optional[np.random.Generator] = None) -> list[tuple[int, int]]:
     """
     Genera puntos usando NumPy basándose en los parámetros interpretados,
     dividido en fases narrativas con lógica ajustada a la emoción.
@@ -193,11 +204,14 @@ def generar_puntos_numpy(parametros: dict, img_width: int, img_height: int) -> l
         parametros: Diccionario con parámetros matemáticos
         img_width (int): Ancho del canvas para límites.
         img_height (int): Alto del canvas para límites.
+        rng: Generador aleatorio del render; si no se indica, se crea uno a partir de la semilla
 
     Returns:
         list: Una lista de tuplas (x, y) con las coordenadas del trazo principal.
     """
-    np.random.seed(parametros['semilla'])
+    # Generador propio (no el global de NumPy) para que renders en hilos distintos no se mezclen
+    if rng is None:
+        rng = np.random.default_rng(parametros['semilla'])
 
     # Normalizar intensidad y calma para que estén en un rango manejable (0-1)
     # Ajustar estos valores máximos según la escala esperada de tus parámetros
@@ -211,8 +225,8 @@ def generar_puntos_numpy(parametros: dict, img_width: int, img_height: int) -> l
     num_puntos_total = parametros['num_puntos']
     
     # Punto de inicio completamente aleatorio en el canvas, con variación emocional
-    start_x = np.random.randint(50, img_width - 50) + int(norm_intensidad * 50 - norm_calma * 20)
-    start_y = np.random.randint(50, img_height - 50) + int(norm_calma * 50 - norm_intensidad * 20)
+    start_x = rng.integers(50, img_width - 50) + int(norm_intensidad * 50 - norm_calma * 20)
+    start_y = rng.integers(50, img_height - 50) + int(norm_calma * 50 - norm_intensidad * 20)
     current_x, current_y = start_x, start_y
 
     all_main_trace_points = [] # Puntos principales del trazo
@@ -271,15 +285,15 @@ def generar_puntos_numpy(parametros: dict, img_width: int, img_height: int) -> l
     for i_phase, (n_puntos, av_x, av_y, amp_onda, freq_onda, ruido) in enumerate(phases_params):
         for i in range(n_puntos):
             # Frecuencia base aleatoria, influenciada por la emoción
-            random_freq_factor = (0.8 + np.random.rand() * 0.4) # Variación aleatoria
+            random_freq_factor = (0.8 + rng.random() * 0.4) # Variación aleatoria
             current_freq_x = freq_onda * 0.05 * random_freq_factor
             current_freq_y = freq_onda * 0.03 * random_freq_factor
 
             onda_x = amp_onda * np.sin((i + wave_offset) * current_freq_x)
             onda_y = amp_onda * np.cos((i + wave_offset) * current_freq_y)
 
-            dx = av_x + np.random.normal(0, ruido / 10) + onda_x
-            dy = av_y + np.random.normal(0, ruido / 10) + onda_y
+            dx = av_x + rng.normal(0, ruido / 10) + onda_x
+            dy = av_y + rng.normal(0, ruido / 10) + onda_y
 
             current_x += dx
             current_y += dy
@@ -295,25 +309,45 @@ def generar_puntos_numpy(parametros: dict, img_width: int, img_height: int) -> l
     return all_main_trace_points
 
 
-def generar_imagen_texto(texto: str) -> Image.Image:
+# Tamaño del canvas de referencia: los trazos se calculan siempre en este espacio
+ANCHO_BASE, ALTO_BASE = 1000, 700
+COLOR_FONDO = '#F5F5F5'
+
+
+@lru_cache(maxsize=16)
+def _cargar_fuente(tamano_base: int, tamano: int):
     """
-    Genera una imagen interpretativa del texto usando Pillow,
-    con el trazo dividido en fases narrativas y grosor dinámico,
-    y múltiples estilos de trazo.
+    Carga la fuente del título y la fecha; ``tamano`` es ``tamano_base`` ya escalado
+    """
+    font_path = "arial.ttf" # Asegúrate de que esta fuente exista o usa una por defecto
+    try:
+        return ImageFont.truetype(font_path, tamano)
+    except IOError:
+        # A tamaño base se conserva la fuente por defecto de siempre
+        if tamano == tamano_base:
+            return ImageFont.load_default() # Fallback
+        try:
+            return ImageFont.load_default(size=tamano)
+        except TypeError: # Pillow < 10.1 no permite elegir el tamaño
+            return ImageFont.load_default()
+
+
+def planificar_imagen_texto(texto: str, fecha: Optional[datetime] = None) -> dict:
+    """
+    Interpreta el texto y calcula todo lo que hay que dibujar (título, trazo
+    según su estilo y fecha) en coordenadas del canvas base de 1000x700,
+    sin reservar todavía ninguna imagen
 
     Args:
         texto: El texto a visualizar
+        fecha: Fecha que se imprime al pie (por defecto, el momento actual)
 
     Returns:
-        Image: Imagen PIL generada
+        dict: Plan de dibujo con las operaciones en orden y sus cajas envolventes
     """
     # Interpretar el texto
     parametros = interpretar_texto_a_parametros(texto)
-
-    # Crear canvas
-    width, height = 1000, 700
-    imagen = Image.new('RGB', (width, height), color='#F5F5F5')
-    draw = ImageDraw.Draw(imagen)
+    width, height = ANCHO_BASE, ALTO_BASE
 
     # Normalizar intensidad y calma para el grosor y estilo del trazo
     max_intensidad = 10
@@ -321,32 +355,27 @@ def generar_imagen_texto(texto: str) -> Image.Image:
     norm_intensidad = np.clip(parametros['intensidad'] / max_intensidad, 0, 1)
     norm_calma = np.clip(parametros['calma'] / max_calma, 0, 1)
 
+    # Un único generador por render, compartido por todas las etapas
+    rng = np.random.default_rng(parametros['semilla'])
+
     # Generar puntos del trazo principal
-    main_trace_points = generar_puntos_numpy(parametros, width, height)
+    main_trace_points = generar_puntos_numpy(parametros, width, height, rng)
+
+    # Cada operación es (tipo, puntos, relleno, extra):
+    # 'linea' -> extra = grosor, 'elipse' -> extra = radio, 'texto' -> extra = (contenido, tamaño de fuente)
+    # Un relleno RGBA indica que la operación se dibuja sobre una capa transparente
+    operaciones = []
 
     # --- Título ---
     titulo = "Trazo del Pensamiento"
-    try:
-        from PIL import ImageFont
-        font_path = "arial.ttf" # Asegúrate de que esta fuente exista o usa una por defecto
-        try:
-            font = ImageFont.truetype(font_path, 24)
-            font_small = ImageFont.truetype(font_path, 12)
-        except IOError:
-            font = ImageFont.load_default() # Fallback
-            font_small = ImageFont.load_default()
-    except ImportError:
-        font = ImageFont.load_default()
-        font_small = ImageFont.load_default()
-
-    draw.text((width // 2, 30), titulo, fill="#000000", anchor='mm', font=font)
+    operaciones.append(('texto', [(width // 2, 30)], "#000000", (titulo, 24)))
 
 
     # --- Selección de Estilo de Trazo y Dibujo ---
     if not main_trace_points or len(main_trace_points) < 2:
         print("No hay suficientes puntos para dibujar el trazo.")
-        draw.text((width // 2, height // 2), "No se pudo generar el trazo", fill="#FF0000", anchor='mm', font=font)
-        return imagen
+        operaciones.append(('texto', [(width // 2, height // 2)], "#FF0000", ("No se pudo generar el trazo", 24)))
+        return _completar_plan(operaciones)
 
     # Lógica de selección de estilo de trazo
     if norm_intensidad > 0.8 and norm_calma < 0.2:
@@ -354,12 +383,12 @@ def generar_imagen_texto(texto: str) -> Image.Image:
         print("Estilo de trazo: Disperso")
         # Dibuja puntos pequeños alrededor de la trayectoria
         for x, y in main_trace_points:
-            num_dots = np.random.randint(5, 15) # Más puntos si es más intenso
+            num_dots = rng.integers(5, 15) # Más puntos si es más intenso
             for _ in range(num_dots):
-                dx = np.random.normal(0, 10 + norm_intensidad * 20) # Mayor dispersión
-                dy = np.random.normal(0, 10 + norm_intensidad * 20)
+                dx = rng.normal(0, 10 + norm_intensidad * 20) # Mayor dispersión
+                dy = rng.normal(0, 10 + norm_intensidad * 20)
                 dot_x, dot_y = int(x + dx), int(y + dy)
-                draw.ellipse([dot_x-2, dot_y-2, dot_x+2, dot_y+2], fill="black", outline="black")
+                operaciones.append(('elipse', [(dot_x, dot_y)], "black", 2))
 
     elif norm_calma > 0.7 and norm_intensidad < 0.3:
         # Estilo "Solitario" / "Fino": Para reflexión, sutileza
@@ -367,29 +396,25 @@ def generar_imagen_texto(texto: str) -> Image.Image:
         # Una sola línea muy fina, quizás con opacidad variable
         base_width = 1
         color = (0, 0, 0, int(255 * (0.3 + norm_calma * 0.7))) # Más opaco con calma
-        
-        # Para dibujar una línea con opacidad se necesita un Image.RGBA y luego combinar
-        temp_img = Image.new('RGBA', (width, height), (0,0,0,0))
-        temp_draw = ImageDraw.Draw(temp_img)
+
+        # El color RGBA hace que estas líneas se dibujen en una capa transparente que luego se combina
         for i in range(len(main_trace_points) - 1):
-            temp_draw.line([main_trace_points[i], main_trace_points[i + 1]], fill=color, width=base_width, joint="curve")
-        imagen = Image.alpha_composite(imagen.convert('RGBA'), temp_img).convert('RGB')
-        draw = ImageDraw.Draw(imagen) # Actualizar el objeto draw
-        
+            operaciones.append(('linea', [main_trace_points[i], main_trace_points[i + 1]], color, base_width))
+
     elif norm_intensidad > 0.5 and norm_calma > 0.4:
         # Estilo "Sólido" / "Marcado": Determinación, firmeza
         print("Estilo de trazo: Sólido")
         # Un trazo más grueso y continuo
         dynamic_width = int(5 + norm_intensidad * 8 - norm_calma * 2) # Más grueso con intensidad
         dynamic_width = max(2, dynamic_width) # Grosor mínimo
-        
+
         for i in range(len(main_trace_points) - 1):
             # Reducción de grosor al final si hay poca calma
             current_width = dynamic_width
             if i > len(main_trace_points) * 0.8 and norm_calma < 0.5:
                 reduction_factor = (1 - (i - len(main_trace_points) * 0.8) / (len(main_trace_points) * 0.2))
                 current_width = int(current_width * reduction_factor)
-            draw.line([main_trace_points[i], main_trace_points[i + 1]], fill="black", width=max(1, current_width), joint="curve")
+            operaciones.append(('linea', [main_trace_points[i], main_trace_points[i + 1]], "black", max(1, current_width)))
 
     elif norm_intensidad > 0.3 and norm_calma < 0.5 and parametros['signos_pregunta'] > 0: # Añadir signo de pregunta como factor
         # Estilo "Fragmentado" / "Interrumpido": Indecisión, interrupción
@@ -399,22 +424,22 @@ def generar_imagen_texto(texto: str) -> Image.Image:
 
         i = 0
         while i < len(main_trace_points) - 1:
-            segment_length = int(segment_length_base * (0.8 + np.random.rand() * 0.4))
-            gap_length = int(gap_length_base * (0.8 + np.random.rand() * 0.4))
-            
+            segment_length = int(segment_length_base * (0.8 + rng.random() * 0.4))
+            gap_length = int(gap_length_base * (0.8 + rng.random() * 0.4))
+
             end_segment = min(i + segment_length, len(main_trace_points) -1)
             if i < end_segment:
-                draw.line(main_trace_points[i:end_segment+1], fill="black", width=2, joint="curve")
-            
+                operaciones.append(('linea', main_trace_points[i:end_segment+1], "black", 2))
+
             i = end_segment + gap_length # Salta el "gap"
-            
+
     else:
         # Estilo "Básico Orgánico" (similar al original, pero una sola línea fluida)
         print("Estilo de trazo: Básico Orgánico")
         base_width = 2
         # El grosor del trazo principal varía con la intensidad
         dynamic_width_factor = 1 + norm_intensidad * 3 - norm_calma * 1.5
-        
+
         for i in range(len(main_trace_points) - 1):
             current_width = int(base_width * dynamic_width_factor)
             # Reducir el grosor hacia el final si hay baja calma (incertidumbre)
@@ -422,47 +447,313 @@ def generar_imagen_texto(texto: str) -> Image.Image:
                  reduction_factor = (1 - (i - len(main_trace_points) * 0.7) / (len(main_trace_points) * 0.3))
                  current_width = int(current_width * reduction_factor * (1 + (1 - norm_calma) * 2))
 
-            draw.line([main_trace_points[i], main_trace_points[i + 1]], fill="black", width=max(1, current_width), joint="curve")
+            operaciones.append(('linea', [main_trace_points[i], main_trace_points[i + 1]], "black", max(1, current_width)))
 
 
 
     # Fecha y hora de creación en la parte inferior
-    fecha_hora = datetime.now().strftime("%d/%m/%Y - %H:%M:%S")
-    draw.text((width // 2, height - 20), fecha_hora, fill='#555', anchor='mm', font=font_small)
+    fecha_hora = (fecha or datetime.now()).strftime("%d/%m/%Y - %H:%M:%S")
+    operaciones.append(('texto', [(width // 2, height - 20)], '#555', (fecha_hora, 12)))
+
+    return _completar_plan(operaciones)
+
+
+def _completar_plan(operaciones: list) -> dict:
+    """
+    Calcula la caja (x0, y0, x1, y1) de los puntos de cada operación, junto con
+    su grosor o radio, para poder descartar las que no tocan una franja; los
+    textos nunca se descartan
+    """
+    cajas = np.empty((len(operaciones), 4))
+    grosores = np.zeros(len(operaciones))
+    elipses = np.zeros(len(operaciones), dtype=bool)
+    for k, (tipo, puntos, _, extra) in enumerate(operaciones):
+        if tipo == 'texto':
+            cajas[k] = (-np.inf, -np.inf, np.inf, np.inf)
+            continue
+        puntos = np.asarray(puntos, dtype=float)
+        cajas[k, :2] = puntos.min(axis=0)
+        cajas[k, 2:] = puntos.max(axis=0)
+        grosores[k] = extra
+        elipses[k] = tipo == 'elipse'
+
+    return {'operaciones': operaciones, 'cajas': cajas, 'grosores': grosores, 'elipses': elipses}
+
+
+def _a_pixel(valor, escala: float, desplazamiento: float):
+    """
+    Lleva una coordenada del canvas base a píxeles de la imagen final.
+    Se redondea en coordenadas absolutas (media unidad hacia arriba) para que
+    el resultado no dependa de la franja que lo dibuja
+    """
+    return np.floor(valor * escala + desplazamiento + 0.5)
+
+
+def _rasterizar_franja(plan: dict, ancho: int, y0: int, alto_franja: int,
+                       escala: float = 1.0, desplazamiento: tuple = (0, 0)) -> Image.Image:
+    """
+    Dibuja una franja horizontal de la imagen final a partir del plan
+
+    Args:
+        plan: Plan de dibujo devuelto por ``planificar_imagen_texto``
+        ancho: Ancho de la imagen final
+        y0: Fila de la imagen final donde empieza la franja
+        alto_franja: Alto de la franja en píxeles
+        escala: Factor entre el canvas base y la imagen final
+        desplazamiento: Posición (x, y) del canvas base escalado dentro de la imagen final
+
+    Returns:
+        Image: Franja RGB de ``ancho x alto_franja``
+    """
+    imagen = Image.new('RGB', (ancho, alto_franja), color=COLOR_FONDO)
+    draw = ImageDraw.Draw(imagen)
+    dx, dy = desplazamiento
+
+    # Solo las operaciones cuya caja toca la franja. El margen se mide en píxeles
+    # de salida con el mismo grosor mínimo de 1 px que usa el dibujo
+    cajas = plan['cajas']
+    grosores = np.maximum(1, np.round(plan['grosores'] * escala))
+    margenes = np.where(plan['elipses'], grosores, grosores / 2) + 2
+    with np.errstate(invalid='ignore'):  # Los textos tienen cajas infinitas
+        y_min = _a_pixel(cajas[:, 1], escala, dy) - margenes - y0
+        y_max = _a_pixel(cajas[:, 3], escala, dy) + margenes - y0
+    visibles = np.nonzero((y_max >= 0) & (y_min < alto_franja))[0]
+
+    def transformar(puntos):
+        return [(int(_a_pixel(x, escala, dx)), int(_a_pixel(y, escala, dy)) - y0) for x, y in puntos]
+
+    # Las líneas con opacidad se acumulan en una capa RGBA y se combinan antes
+    # de la siguiente operación opaca, como si se dibujaran por separado
+    capa = None
+    for k in visibles:
+        tipo, puntos, relleno, extra = plan['operaciones'][k]
+        transparente = isinstance(relleno, tuple) and len(relleno) == 4
+
+        if capa is not None and not transparente:
+            imagen = Image.alpha_composite(imagen.convert('RGBA'), capa).convert('RGB')
+            draw = ImageDraw.Draw(imagen) # Actualizar el objeto draw
+            capa = None
+        if transparente and capa is None:
+            capa = Image.new('RGBA', imagen.size, (0, 0, 0, 0))
+        destino = ImageDraw.Draw(capa) if transparente else draw
+
+        if tipo == 'linea':
+            destino.line(transformar(puntos), fill=relleno, width=max(1, round(extra * escala)), joint="curve")
+        elif tipo == 'elipse':
+            (cx, cy), = transformar(puntos)
+            radio = max(1, round(extra * escala))
+            destino.ellipse([cx-radio, cy-radio, cx+radio, cy+radio], fill=relleno, outline=relleno)
+        else:
+            contenido, tamano_fuente = extra
+            destino.text(transformar(puntos)[0], contenido, fill=relleno, anchor='mm',
+                         font=_cargar_fuente(tamano_fuente, max(1, round(tamano_fuente * escala))))
+
+    if capa is not None:
+        imagen = Image.alpha_composite(imagen.convert('RGBA'), capa).convert('RGB')
 
     return imagen
 
+
+def generar_imagen_texto(texto: str, fecha: Optional[datetime] = None) -> Image.Image:
+    """
+    Genera una imagen interpretativa del texto usando Pillow,
+    con el trazo dividido en fases narrativas y grosor dinámico,
+    y múltiples estilos de trazo.
+
+    No usa estado global: el mismo texto y la misma fecha dan siempre la misma
+    imagen, aunque se generen varias a la vez en hilos distintos.
+
+    Args:
+        texto: El texto a visualizar
+        fecha: Fecha que se imprime al pie (por defecto, el momento actual)
+
+    Returns:
+        Image: Imagen PIL generada
+    """
+    plan = planificar_imagen_texto(texto, fecha)
+    return _rasterizar_franja(plan, ANCHO_BASE, 0, ALTO_BASE)
+
+
+def generar_imagenes_texto(textos: list[str], hilos: int = 4,
+                           fecha: Optional[datetime] = None) -> list[Image.Image]:
+    """
+    Genera varias imágenes en paralelo con un pool de hilos (Pillow libera el
+    GIL al dibujar y codificar)
+
+    Args:
+        textos: Textos a visualizar
+        hilos: Número máximo de hilos
+        fecha: Fecha común para el pie de todas las imágenes (por defecto, la actual)
+
+    Returns:
+        list: Imágenes PIL en el mismo orden que ``textos``
+    """
+    fecha = fecha or datetime.now()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        return list(pool.map(lambda texto: generar_imagen_texto(texto, fecha), textos))
+
+
+def _fragmento_png(tipo: bytes, datos: bytes) -> bytes:
+    return struct.pack('>I', len(datos)) + tipo + datos + struct.pack('>I', zlib.crc32(tipo + datos))
+
+
+def exportar_imagen_texto(texto: str, destino, ancho: int, alto: int, alto_franja: int = 256,
+                          hilos: int = 1, fecha: Optional[datetime] = None) -> None:
+    """
+    Renderiza el trazo del texto a cualquier resolución (p. ej. 12000x8400 para
+    impresión) y lo escribe como PNG por franjas, sin reservar nunca el canvas
+    completo: la memoria usada depende de ``ancho x alto_franja``
+
+    El trazo es el mismo que en ``generar_imagen_texto``, escalado y centrado.
+
+    Args:
+        texto: El texto a visualizar
+        destino: Archivo binario abierto para escritura
+        ancho: Ancho de la imagen final en píxeles
+        alto: Alto de la imagen final en píxeles
+        alto_franja: Filas que se dibujan y codifican de una vez
+        hilos: Franjas que se dibujan en paralelo (la memoria crece en proporción)
+        fecha: Fecha que se imprime al pie (por defecto, el momento actual)
+
+    Raises:
+        ValueError: Si alguna dimensión, el alto de franja o los hilos no son positivos
+    """
+    if ancho <= 0 or alto <= 0:
+        raise ValueError(f"Tamaño de imagen no válido: {ancho}x{alto}")
+    if alto_franja <= 0 or hilos <= 0:
+        raise ValueError("alto_franja e hilos deben ser positivos")
+
+    plan = planificar_imagen_texto(texto, fecha)
+
+    escala = min(ancho / ANCHO_BASE, alto / ALTO_BASE)
+    desplazamiento = ((ancho - ANCHO_BASE * escala) / 2, (alto - ALTO_BASE * escala) / 2)
+
+    # Cabecera PNG: RGB de 8 bits sin entrelazar
+    destino.write(b'\x89PNG\r\n\x1a\n')
+    destino.write(_fragmento_png(b'IHDR', struct.pack('>IIBBBBB', ancho, alto, 8, 2, 0, 0, 0)))
+
+    def dibujar(y0):
+        return _rasterizar_franja(plan, ancho, y0, min(alto_franja, alto - y0), escala, desplazamiento)
+
+    def franjas():
+        # Como mucho ``hilos`` franjas en vuelo, para que la memoria siga acotada
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            pendientes = deque()
+            for y0 in range(0, alto, alto_franja):
+                pendientes.append(pool.submit(dibujar, y0))
+                if len(pendientes) >= hilos:
+                    yield pendientes.popleft().result()
+            while pendientes:
+                yield pendientes.popleft().result()
+
+    compresor = zlib.compressobj(6)
+    for franja in franjas():
+        pixeles = np.asarray(franja, dtype=np.uint8).reshape(franja.height, ancho * 3)
+
+        # Filtro "Sub" de PNG por fila: cada byte menos el del píxel de la izquierda
+        filas = np.empty((franja.height, ancho * 3 + 1), dtype=np.uint8)
+        filas[:, 0] = 1
+        filas[:, 1:4] = pixeles[:, :3]
+        np.subtract(pixeles[:, 3:], pixeles[:, :-3], out=filas[:, 4:])
+
+        datos = compresor.compress(filas.tobytes())
+        if datos:
+            destino.write(_fragmento_png(b'IDAT', datos))
+
+    destino.write(_fragmento_png(b'IDAT', compresor.flush()))
+    destino.write(_fragmento_png(b'IEND', b''))
+
+
 #---- Aquí terminó la prueba usando Numpy/Pillow  ----#
 #---- Aquí terminó la prueba usando Numpy/Pillow  ----#
 #---- Aquí terminó la prueba usando Numpy/Pillow  ----#
 
 
 
-def guardar_imagen_texto(texto: str) -> str:
+# Almacén compartido; se crea una sola vez al primer guardado
+_almacen_imagenes = None
+_lock_almacen = threading.Lock()
+
+
+def obtener_almacen_imagenes() -> AlmacenImagenes:
+    """
+    Devuelve el almacén de imágenes del proyecto, creándolo (y arrancando su
+    barrido de retención) la primera vez que se necesita
+
+    Returns:
+        AlmacenImagenes: Almacén ubicado en ``imagenes_generadas/``
+    """
+    global _almacen_imagenes
+    if _almacen_imagenes is None:
+        with _lock_almacen:
+            if _almacen_imagenes is None:
+                proyecto_root = FilePath(__file__).parent.parent
+                almacen = AlmacenImagenes(proyecto_root / "imagenes_generadas")
+                almacen.iniciar_barrido()
+                _almacen_imagenes = almacen
+    return _almacen_imagenes
+
+
+def guardar_imagen(imagen: Image.Image, esperar: bool = False) -> str:
+    """
+    Guarda una imagen ya generada en el almacén de imágenes
+
+    Args:
+        imagen: Imagen PIL a guardar (no debe modificarse después)
+        esperar: Si es True, espera a que el PNG esté escrito en disco
+
+    Returns:
+        str: Ruta donde se guardará (o se guardó) la imagen
+    """
+    # Crear nombre de archivo único
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    nombre_archivo = f"trazo_{timestamp}_{uuid.uuid4().hex[:8]}.png"
+
+    almacen = obtener_almacen_imagenes()
+    escritura = almacen.guardar(imagen, nombre_archivo)
+    if esperar:
+        escritura.result()
+
+    return str(almacen.ruta_para(nombre_archivo))
+
+
+def guardar_imagen_texto(texto: str, esperar: bool = False) -> str:
     """
     Genera y guarda una imagen interpretativa del texto
 
+    El PNG se escribe en segundo plano; la ruta devuelta es la definitiva.
+
     Args:
         texto: El texto a visualizar
+        esperar: Si es True, espera a que el PNG esté escrito en disco
 
     Returns:
-        str: Ruta donde se guardó la imagen
+        str: Ruta donde se guardará (o se guardó) la imagen
     """
     # Generar la imagen
     imagen = generar_imagen_texto(texto)
 
-    # Crear nombre de archivo único
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    nombre_archivo = f"trazo_{timestamp}.png"
+    return guardar_imagen(imagen, esperar=esperar)
 
-    # Determinar ruta de guardado
-    proyecto_root = FilePath(__file__).parent.parent
-    carpeta_imagenes = proyecto_root / "imagenes_generadas"
-    carpeta_imagenes.mkdir(exist_ok=True)
 
-    ruta_completa = carpeta_imagenes / nombre_archivo
+def guardar_imagen_texto_poster(texto: str, ancho: int = 12000, alto: int = 8400) -> str:
+    """
+    Genera y guarda una versión en alta resolución (para impresión) del trazo,
+    escribiéndola por franjas directamente en el almacén de imágenes
+
+    Args:
+        texto: El texto a visualizar
+        ancho: Ancho de la imagen en píxeles
+        alto: Alto de la imagen en píxeles
+
+    Returns:
+        str: Ruta donde se guardó la imagen
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    nombre_archivo = f"trazo_{timestamp}_{uuid.uuid4().hex[:8]}_{ancho}x{alto}.png"
 
-    # Guardar imagen
-    imagen.save(ruta_completa, 'PNG')
+    almacen = obtener_almacen_imagenes()
+    with almacen.abrir_escritura(nombre_archivo) as archivo:
+        exportar_imagen_texto(texto, archivo, ancho, alto)
 
-    return str(ruta_completa)
+    return str(almacen.ruta_para(nombre_archivo))
@@ -5,15 +5,16 @@ Este servidor detecta comandos especiales ANTES de pasar mensajes al agente
 import asyncio
 import re
 from pathlib import Path
-from fastapi import FastAPI, Request
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from google.adk.runner import run
 from google.adk.sessions import InMemorySession
 import google.genai.types as types
 
 # Importar el agente y funciones
-from datar_a_gente.agent import root_agent, guardar_interpretacion_emocional, crear_imagen_rio_emocional, extraer_emojis, detectar_comando_imagen
+from datar_a_gente.agent import root_agent, guardar_interpretacion_emocional, crear_imagen_rio_emocional_sesion, extraer_emojis, detectar_comando_imagen
+from datar_a_gente.montaje import obtener_montaje
 
 app = FastAPI()
 
@@ -48,8 +49,8 @@ async def procesar_mensaje_con_interceptor(session_id: str, mensaje: str, contex
         interpretacion = _sesiones_interpretaciones[session_id]
         await guardar_interpretacion_emocional(interpretacion)
 
-        # Llamar a la herramienta para crear imagen
-        resultado = await crear_imagen_rio_emocional()
+        # Crear la imagen y sumarla al montaje de esta sesión
+        resultado = await crear_imagen_rio_emocional_sesion(session_id)
 
         # Limpiar después de usar
         _sesiones_interpretaciones[session_id] = ""
@@ -90,13 +91,34 @@ async def chat_endpoint(request: Request):
     return JSONResponse({"respuesta": respuesta})
 
 
+@app.get("/montaje/{session_id}")
+def montaje_endpoint(session_id: str, hoja: int = -1):
+    """
+    Devuelve el montaje (hoja de contactos) con los trazos de la sesión
+
+    Es síncrono a propósito: FastAPI lo ejecuta en su pool de hilos, ya que
+    leer o codificar la hoja bloquea
+    """
+    montaje = obtener_montaje(session_id)
+    if montaje.total_hojas == 0:
+        raise HTTPException(status_code=404, detail="La sesión aún no tiene trazos")
+
+    try:
+        png = montaje.png(hoja)
+    except IndexError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return Response(content=png, media_type="image/png")
+
+
 @app.get("/")
 async def root():
     return {
         "mensaje": "Servidor personalizado de Diario Intuitivo",
         "comandos": [
             "/imagen", "!imagen", "visualiza", "crea imagen", "genera imagen"
-        ]
+        ],
+        "montaje": "/montaje/{session_id}?hoja=-1"
     }
 
 
@@ -0,0 +1,15 @@
+"""
+La carpeta del paquete (``datar_a-gente``) no es un nombre importable, así que
+se registra como ``datar_a_gente`` sin ejecutar su ``__init__`` (que carga el
+agente y sus dependencias de ADK)
+"""
+import sys
+import types
+from pathlib import Path
+
+_carpeta_paquete = Path(__file__).parent.parent / "datar_a-gente"
+
+if "datar_a_gente" not in sys.modules:
+    paquete = types.ModuleType("datar_a_gente")
+    paquete.__path__ = [str(_carpeta_paquete)]
+    sys.modules["datar_a_gente"] = paquete
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import stat
+import time
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from datar_a_gente.almacen_imagenes import GRACIA_TEMPORALES_SEGUNDOS, AlmacenImagenes
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    almacen = AlmacenImagenes(tmp_path)
+    yield almacen
+    almacen.cerrar()
+
+
+def _escribir(almacen, nombre, datos=b"x" * 100, edad=0):
+    with almacen.abrir_escritura(nombre) as archivo:
+        archivo.write(datos)
+    ruta = almacen.ruta_para(nombre)
+    mtime = time.time() - edad
+    os.utime(ruta, (mtime, mtime))
+    return ruta
+
+
+def _temporales(raiz):
+    return [ruta for ruta in raiz.rglob(".*.tmp")]
+
+
+def test_ruta_para_reparte_por_hash(almacen):
+    digest = hashlib.sha1("trazo.png".encode("utf-8")).hexdigest()
+
+    ruta = almacen.ruta_para("trazo.png")
+
+    assert ruta.relative_to(almacen.raiz).parts == (digest[:2], digest[2:4], "trazo.png")
+
+
+def test_escritura_atomica_reemplaza_y_respeta_la_umask(almacen):
+    ruta = _escribir(almacen, "a.png", b"primero")
+    _escribir(almacen, "a.png", b"segundo")
+
+    assert ruta.read_bytes() == b"segundo"
+    assert _temporales(almacen.raiz) == []
+
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(ruta.stat().st_mode) == 0o666 & ~umask
+
+
+def test_escritura_fallida_no_deja_rastro(almacen):
+    ruta = _escribir(almacen, "a.png", b"original")
+
+    with pytest.raises(RuntimeError):
+        with almacen.abrir_escritura("a.png") as archivo:
+            archivo.write(b"a medias")
+            raise RuntimeError("fallo")
+
+    assert ruta.read_bytes() == b"original"
+    assert _temporales(almacen.raiz) == []
+
+
+def test_guardar_informa_de_los_errores(almacen, capsys):
+    escritura = almacen.guardar("no es una imagen", "roto.png")
+
+    with pytest.raises(AttributeError):
+        escritura.result()
+    assert "roto.png" in capsys.readouterr().out
+    assert not almacen.ruta_para("roto.png").exists()
+
+
+def test_guardar_escribe_el_png(almacen):
+    ruta = almacen.guardar(Image.new("RGB", (4, 3), "red"), "b.png").result()
+
+    assert ruta == almacen.ruta_para("b.png")
+    assert Image.open(ruta).size == (4, 3)
+
+
+def test_barrer_por_edad_y_luego_por_tamano(almacen):
+    almacen.max_edad_segundos = 1000
+    almacen.max_bytes_totales = 250
+
+    vieja = _escribir(almacen, "vieja.png", edad=2000)
+    antigua = _escribir(almacen, "antigua.png", edad=300)
+    media = _escribir(almacen, "media.png", edad=200)
+    nueva = _escribir(almacen, "nueva.png", edad=100)
+
+    # Por edad cae "vieja"; quedan 300 bytes > 250, así que cae la más antigua
+    assert almacen.barrer() == 2
+    assert not vieja.exists() and not antigua.exists()
+    assert media.exists() and nueva.exists()
+
+    # Las subcarpetas que quedaron vacías se eliminan
+    assert not vieja.parent.exists() and not antigua.parent.exists()
+    assert all(any(carpeta.iterdir()) for carpeta in almacen.raiz.rglob("*") if carpeta.is_dir())
+
+
+def test_barrer_borra_temporales_huerfanos(almacen):
+    carpeta = almacen.raiz / "ab" / "cd"
+    carpeta.mkdir(parents=True)
+    huerfano = carpeta / ".resto.tmp"
+    huerfano.write_bytes(b"x" * 100)
+    viejo = time.time() - GRACIA_TEMPORALES_SEGUNDOS - 10
+    os.utime(huerfano, (viejo, viejo))
+    en_curso = carpeta / ".en_curso.tmp"
+    en_curso.write_bytes(b"x" * 100)
+
+    assert almacen.barrer() == 1
+    assert not huerfano.exists()
+    assert en_curso.exists()
+
+
+def test_barrer_no_toca_archivos_sueltos_en_la_raiz(almacen):
+    almacen.max_edad_segundos = 0
+    ejemplo = almacen.raiz / "trazo_ejemplo.png"
+    ejemplo.write_bytes(b"x")
+    os.utime(ejemplo, (0, 0))
+
+    assert almacen.barrer() == 0
+    assert ejemplo.exists()
+
+
+def test_escribir_tras_podar_vuelve_a_crear_la_carpeta(almacen):
+    almacen.max_edad_segundos = 0
+    ruta = _escribir(almacen, "a.png", edad=10)
+    almacen.barrer()
+    assert not ruta.parent.exists()
+
+    assert _escribir(almacen, "a.png").exists()
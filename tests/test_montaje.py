@@ -0,0 +1,100 @@
+import io
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("google.genai")
+Image = pytest.importorskip("PIL.Image")
+
+from datar_a_gente.almacen_imagenes import AlmacenImagenes
+from datar_a_gente.montaje import (
+    ANCHO_MINIATURA,
+    ALTO_MINIATURA,
+    COLUMNAS,
+    FILAS,
+    MontajeSesion,
+)
+
+
+ROJO = (255, 0, 0)
+AZUL = (0, 0, 255)
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    almacen = AlmacenImagenes(tmp_path)
+    yield almacen
+    almacen.cerrar()
+
+
+def _trazo(color):
+    return Image.new("RGB", (1000, 700), color)
+
+
+def _hoja(montaje, hoja=-1):
+    return Image.open(io.BytesIO(montaje.png(hoja))).convert("RGB")
+
+
+def _color_celda(hoja, indice):
+    x, y = MontajeSesion.posicion_celda(indice)
+    return hoja.getpixel((x + ANCHO_MINIATURA // 2, y + ALTO_MINIATURA // 2))
+
+
+def test_cada_trazo_ocupa_la_siguiente_celda(almacen):
+    montaje = MontajeSesion("sesion", almacen)
+    montaje.agregar(_trazo(ROJO))
+    montaje.agregar(_trazo(AZUL))
+
+    hoja = _hoja(montaje)
+    assert _color_celda(hoja, 0) == ROJO
+    assert _color_celda(hoja, 1) == AZUL
+    assert _color_celda(hoja, 2) not in (ROJO, AZUL)
+    assert montaje.total_hojas == 1
+
+
+def test_hoja_llena_se_guarda_y_la_ultima_no_queda_vacia(almacen):
+    montaje = MontajeSesion("sesion", almacen)
+    for _ in range(COLUMNAS * FILAS):
+        montaje.agregar(_trazo(ROJO))
+
+    # La hoja recién llenada sigue siendo la última, no una hoja en blanco
+    assert montaje.total_hojas == 1
+    assert _color_celda(_hoja(montaje), COLUMNAS * FILAS - 1) == ROJO
+
+    montaje.agregar(_trazo(AZUL))
+    assert montaje.total_hojas == 2
+    assert _color_celda(_hoja(montaje), 0) == AZUL
+    assert _color_celda(_hoja(montaje, 0), 0) == ROJO
+
+
+def test_hoja_inexistente_o_borrada(almacen):
+    montaje = MontajeSesion("sesion", almacen)
+    with pytest.raises(IndexError):
+        montaje.png()
+
+    for _ in range(COLUMNAS * FILAS + 1):
+        montaje.agregar(_trazo(ROJO))
+    with pytest.raises(IndexError, match="-9"):
+        montaje.png(-9)
+    with pytest.raises(IndexError):
+        montaje.png(2)
+
+    # Simula que la retención del almacén borró la hoja llena
+    almacen.cerrar()  # Espera las escrituras pendientes
+    ruta = almacen.buscar("montaje_*_0000.png")[0]
+    ruta.unlink()
+    with pytest.raises(IndexError, match="ya no está disponible"):
+        montaje.png(0)
+
+
+def test_una_sesion_recupera_sus_hojas_del_almacen(almacen):
+    montaje = MontajeSesion("sesion", almacen)
+    montaje.agregar(_trazo(ROJO))
+    montaje.guardar_hoja_en_curso()
+    almacen.cerrar()  # Espera las escrituras pendientes
+    guardada = montaje.png(0)
+
+    recuperado = MontajeSesion("sesion", almacen)
+    assert recuperado.total_hojas == 1
+    assert recuperado.png(0) == guardada
+    assert MontajeSesion("otra sesion", almacen).total_hojas == 0
@@ -0,0 +1,89 @@
+import io
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("google.genai")
+Image = pytest.importorskip("PIL.Image")
+
+from datar_a_gente.visualizacion import (
+    exportar_imagen_texto,
+    generar_imagen_texto,
+    generar_imagenes_texto,
+)
+
+
+FECHA = datetime(2026, 1, 1, 12, 0, 0)
+
+# Un texto por estilo de trazo
+TEXTOS = [
+    "Hola mundo",  # Básico Orgánico
+    "¡Ay! ¡No! ¡Qué! ¡Caos! ¡Ya! ¡Basta!",  # Disperso
+    "Calma. Paz. Río. Agua. Suave. Lento. Quieto.",  # Solitario
+    "¡Fuerte! ¡Firme! ¡Sí! ¡Va! Paso. Paso. Paso.",  # Sólido
+    "¡¡¡Qué!!! ¿Sí?",  # Fragmentado
+]
+
+
+def _png(imagen):
+    buf = io.BytesIO()
+    imagen.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _exportar(texto, ancho, alto, **kwargs):
+    destino = io.BytesIO()
+    exportar_imagen_texto(texto, destino, ancho, alto, fecha=FECHA, **kwargs)
+    imagen = Image.open(io.BytesIO(destino.getvalue()))
+    imagen.load()
+    return imagen
+
+
+@pytest.mark.parametrize("texto", TEXTOS)
+def test_exportar_a_tamano_base_coincide_con_render_normal(texto):
+    exportada = _exportar(texto, 1000, 700, alto_franja=97)
+
+    assert exportada.mode == "RGB"
+    assert exportada.size == (1000, 700)
+    assert exportada.tobytes() == generar_imagen_texto(texto, FECHA).tobytes()
+
+
+@pytest.mark.parametrize("texto", TEXTOS)
+@pytest.mark.parametrize("ancho, alto, alto_franja", [
+    (2000, 1400, 97),
+    (1500, 1050, 7),  # Escala no entera
+    (300, 210, 5),
+    (100, 70, 1),  # Escala < 1: grosores mínimos de 1 px
+    (37, 26, 1),
+])
+def test_exportar_no_depende_del_alto_de_franja(texto, ancho, alto, alto_franja):
+    por_franjas = _exportar(texto, ancho, alto, alto_franja=alto_franja)
+    de_una_vez = _exportar(texto, ancho, alto, alto_franja=alto)
+
+    assert por_franjas.tobytes() == de_una_vez.tobytes()
+
+
+@pytest.mark.parametrize("ancho, alto", [(0, 700), (1000, 0), (-5, 700)])
+def test_exportar_rechaza_tamanos_no_positivos(ancho, alto):
+    with pytest.raises(ValueError):
+        exportar_imagen_texto("Hola mundo", io.BytesIO(), ancho, alto)
+
+
+def test_generar_imagenes_en_paralelo_es_identico_al_render_secuencial():
+    textos = TEXTOS * 8
+    secuencial = [_png(generar_imagen_texto(texto, FECHA)) for texto in textos]
+
+    for _ in range(3):
+        en_paralelo = generar_imagenes_texto(textos, hilos=8, fecha=FECHA)
+        assert [_png(imagen) for imagen in en_paralelo] == secuencial
+
+
+@pytest.mark.parametrize("texto", TEXTOS)
+def test_exportar_con_hilos_es_identico_a_un_hilo(texto):
+    def exportar(hilos):
+        destino = io.BytesIO()
+        exportar_imagen_texto(texto, destino, 2000, 1400, alto_franja=97, hilos=hilos, fecha=FECHA)
+        return destino.getvalue()
+
+    assert exportar(4) == exportar(1)